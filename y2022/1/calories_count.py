@@ -1,16 +1,192 @@
+import heapq
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Iterable, Iterator, List, Tuple
 
+import numpy as np
 
-with open('input.txt') as file:
-    top_3 = [0, 0, 0]
+
+@dataclass(frozen=True)
+class Elf:
+    index: int
+    calories: int
+
+
+def group_sums(lines: Iterable) -> Iterator[Tuple[int, int]]:
+    """Yield (group index, calories sum) for every run of non-blank lines, reading one line at a time."""
+    index = 0
     current_backpack = 0
-    for line in file.readlines():
-        if line == '\n':
-            if current_backpack > min(top_3):
-                top_3.sort(reverse=True)
-                top_3.pop()
-                top_3.append(current_backpack)
-            current_backpack = 0
-        else:
+    in_group = False
+    for line in lines:
+        if line.strip():
             current_backpack += int(line)
+            in_group = True
+        elif in_group:
+            yield index, current_backpack
+            index += 1
+            current_backpack = 0
+            in_group = False
+
+    if in_group:
+        yield index, current_backpack
+
+
+def top_k_elves(sums: Iterable[Tuple[int, int]], k: int = 3) -> List[Elf]:
+    """Top k of (group index, calories) pairs, biggest first. Ties go to the group that came first."""
+    if k <= 0:
+        return []
+
+    heap: List[Tuple[int, int]] = []
+    for index, calories in sums:
+        if len(heap) < k:
+            heapq.heappush(heap, (calories, -index))
+        elif (calories, -index) > heap[0]:
+            heapq.heapreplace(heap, (calories, -index))
+
+    return [Elf(-negative_index, calories) for calories, negative_index in sorted(heap, reverse=True)]
+
+
+def top_k_calories(lines: Iterable, k: int = 3) -> List[Elf]:
+    return top_k_elves(group_sums(lines), k)
+
+
+def split_points(memory, parts: int) -> List[int]:
+    """Byte offsets cutting the file into at most `parts` ranges, each starting right after a blank line."""
+    size = len(memory)
+    points = [0]
+    for i in range(1, parts):
+        blank_line = memory.find(b'\n\n', max(size * i // parts - 1, points[-1]))
+        if blank_line == -1:
+            break
+        points.append(blank_line + 2)
+
+    if points[-1] != size:
+        points.append(size)
+    return points
+
+
+def chunk_lines(memory, start: int, end: int) -> Iterator[bytes]:
+    memory.seek(start)
+    while memory.tell() < end:
+        yield memory.readline()
+
+
+def chunk_top_k(file_name: str, start: int, end: int, k: int) -> Tuple[int, List[Elf]]:
+    """Number of groups in the byte range and its top k, with group indices local to the range."""
+    group_count = 0
+
+    def counted_sums(memory):
+        nonlocal group_count
+        for index, calories in group_sums(chunk_lines(memory, start, end)):
+            group_count = index + 1
+            yield index, calories
+
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+        top = top_k_elves(counted_sums(memory), k)
+    return group_count, top
+
+
+def parallel_top_k_calories(file_name: str, k: int = 3, workers: int = None) -> List[Elf]:
+    """Same result as top_k_calories, with the file split on blank lines and summed in a process pool."""
+    if os.path.getsize(file_name) == 0:
+        return []
+
+    workers = workers or os.cpu_count()
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+        points = split_points(memory, workers)
+
+    with ProcessPoolExecutor(workers) as executor:
+        results = list(executor.map(chunk_top_k, repeat(file_name), points[:-1], points[1:], repeat(k)))
+
+    candidates = []
+    offset = 0
+    for group_count, elves in results:
+        candidates += [(elf.index + offset, elf.calories) for elf in elves]
+        offset += group_count
+    return top_k_elves(candidates, k)
+
+
+def calorie_group_sums(data: bytes) -> np.ndarray:
+    """Calories sum of every group, in file order, parsed from the raw bytes without a Python loop per line.
+
+    Each digit is weighted by the power of ten of its place in the line, then lines and groups are summed with
+    reduceat. Anything that is not a digit (spaces, '\\r') is ignored, and a line with no digit is blank.
+    """
+    symbols = np.frombuffer(data, dtype=np.uint8)
+    if not data.endswith(b'\n'):
+        symbols = np.append(symbols, np.uint8(ord('\n')))
+
+    newlines = symbols == ord('\n')
+    line_ends = np.flatnonzero(newlines)
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+
+    is_digit = (symbols >= ord('0')) & (symbols <= ord('9'))
+    digits_before = np.concatenate(([0], np.cumsum(is_digit)))
+    filled = digits_before[line_ends] > digits_before[line_starts]
+    if not filled.any():
+        return np.zeros(0, dtype=np.int64)
+
+    line_of_symbol = np.cumsum(newlines) - newlines
+    places = digits_before[line_ends[line_of_symbol]] - digits_before[1:]
+    weighted = np.where(is_digit, (symbols.astype(np.int64) - ord('0')) * 10 ** places, 0)
+    values = np.add.reduceat(weighted, line_starts)[filled]
+
+    group_starts = filled & ~np.concatenate(([False], filled[:-1]))
+    return np.add.reduceat(values, np.flatnonzero(group_starts[filled]))
+
+
+def load_calorie_group_sums(file_name: str) -> np.ndarray:
+    with open(file_name, 'rb') as file:
+        return calorie_group_sums(file.read())
+
+
+def top_k_calories_numpy(sums: np.ndarray, k: int = 3) -> List[Elf]:
+    """Same ordering as top_k_elves, picked with argpartition instead of a heap."""
+    if k <= 0:
+        return []
+
+    if k >= len(sums):
+        indexes = np.arange(len(sums))
+    else:
+        kth_calories = sums[np.argpartition(-sums, k - 1)[k - 1]]
+        above = np.flatnonzero(sums > kth_calories)
+        tied = np.flatnonzero(sums == kth_calories)[:k - len(above)]
+        indexes = np.concatenate((above, tied))
+
+    indexes = indexes[np.lexsort((indexes, -sums[indexes]))]
+    return [Elf(int(index), int(sums[index])) for index in indexes]
+
+
+test_lines = ['1000', '2000', '3000', '', '4000', '', '5000', '6000', '', '7000', '8000', '9000', '', '10000']
+assert list(group_sums(test_lines)) == [(0, 6000), (1, 4000), (2, 11000), (3, 24000), (4, 10000)]
+assert top_k_calories(test_lines, 3) == [Elf(3, 24000), Elf(2, 11000), Elf(4, 10000)]
+assert top_k_calories(test_lines, 1) == [Elf(3, 24000)]
+assert top_k_calories(['1', '', '1', '', '', '1'], 2) == [Elf(0, 1), Elf(1, 1)]
+assert top_k_calories(test_lines, 0) == []
+
+test_bytes = b'\n'.join(line.encode() for line in test_lines) + b'\n'
+assert split_points(test_bytes, 3) == [0, 22, 49, len(test_bytes)]
+assert split_points(test_bytes, 1) == [0, len(test_bytes)]
+
+assert calorie_group_sums(test_bytes).tolist() == [6000, 4000, 11000, 24000, 10000]
+assert top_k_calories_numpy(calorie_group_sums(test_bytes), 3) == top_k_calories(test_lines, 3)
+assert top_k_calories_numpy(calorie_group_sums(b'\n1\n\n1\n\n\n1'), 2) == [Elf(0, 1), Elf(1, 1)]
+assert calorie_group_sums(b'\n\n').tolist() == []
+assert calorie_group_sums(b'').tolist() == []
+assert calorie_group_sums(b'12\r\n 3\r\n\r\n400\n\n5').tolist() == [15, 400, 5]
+assert top_k_calories_numpy(calorie_group_sums(test_bytes), 0) == []
+assert top_k_calories_numpy(calorie_group_sums(test_bytes), -1) == top_k_calories(test_lines, -1) == []
+
+
+with open('input.txt') as file:
+    top_3 = top_k_calories(file, 3)
+
+print(sum(elf.calories for elf in top_3))
+
+assert top_k_calories_numpy(load_calorie_group_sums('input.txt'), 3) == top_3
 
-        print(sum(top_3))
+if __name__ == '__main__':
+    assert parallel_top_k_calories('input.txt', 3, workers=4) == top_3
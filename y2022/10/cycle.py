@@ -3,7 +3,9 @@ from __future__ import annotations
 import copy
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Literal, Optional, List
+from typing import Literal, Optional, List, Iterable
+
+import numpy as np
 
 
 class CommandType(Enum):
@@ -142,6 +144,56 @@ class Device:
         return sum(log.signal_str for log in self.logs)
 
 
+class CompiledProgram:
+    """The program expanded into per-cycle X deltas, and the X register trace built from them with one cumsum."""
+
+    def __init__(self, commands: List[Command]):
+        cycles = np.array([command.type.cycles for command in commands], dtype=np.int64)
+        values = np.array([command.value or 0 for command in commands], dtype=np.int64)
+        finish_cycles = np.cumsum(cycles)
+
+        deltas = np.zeros(int(finish_cycles[-1]) if len(commands) else 0, dtype=np.int64)
+        deltas[finish_cycles - 1] = values
+        # X during every cycle of the program, then once more for every cycle after it
+        self.trace = 1 + np.concatenate(([0], np.cumsum(deltas)))
+        self.register_X = self.trace[:-1]
+        self.final_X = int(self.trace[-1])
+
+    def signal_strengths(self, cycles: Iterable[int]) -> np.ndarray:
+        """Cycle times X during that cycle. Cycles after the program ends see the final X."""
+        cycles = np.asarray(list(cycles), dtype=np.int64)
+        if (cycles < 1).any():
+            raise ValueError('Cycles start at 1')
+
+        return cycles * self.trace[np.minimum(cycles, len(self.trace)) - 1]
+
+    def framebuffer(self, width: int = CRT.width, lines: int = CRT.lines) -> np.ndarray:
+        """Lit pixels as a (lines, width) bool array: a pixel is lit when the sprite covers its column."""
+        register_X = self.register_X[:width * lines]
+        columns = np.arange(len(register_X)) % width
+        lit = np.zeros(width * lines, dtype=bool)
+        lit[:len(register_X)] = np.abs(register_X - columns) <= 1
+        return lit.reshape(lines, width)
+
+    def render(self, width: int = CRT.width, lines: int = CRT.lines) -> List[str]:
+        return [''.join('#' if pixel else '.' for pixel in row) for row in self.framebuffer(width, lines)]
+
+
+test_program = CompiledProgram([Command(CommandType.NOOP), Command(CommandType.ADDX, 3), Command(CommandType.ADDX, -5)])
+assert test_program.register_X.tolist() == [1, 1, 1, 4, 4]
+assert test_program.signal_strengths([2, 5]).tolist() == [2, 20]
+assert test_program.signal_strengths([6, 500]).tolist() == [-6, -500]
+assert CompiledProgram([]).signal_strengths([3]).tolist() == [3]
+try:
+    test_program.signal_strengths([0])
+except ValueError:
+    pass
+else:
+    raise AssertionError('cycle 0 accepted')
+assert test_program.render(width=5, lines=1) == ['#####']
+assert test_program.render(width=3, lines=2) == ['###', '...']
+
+
 crt = CRT()
 device = Device(crt)
 commands = load_commands('input.txt')
@@ -150,3 +202,14 @@ device.load_commands(commands)
 device.run()
 
 crt.show()
+
+compiled_program = CompiledProgram(load_commands('input.txt'))
+assert int(compiled_program.signal_strengths(Device.cycles_to_log).sum()) == device.log_signal_str_sum()
+assert compiled_program.render() == [
+    '####..##..#....#..#.###..#....####...##.',
+    '#....#..#.#....#..#.#..#.#....#.......#.',
+    '###..#....#....####.###..#....###.....#.',
+    '#....#.##.#....#..#.#..#.#....#.......#.',
+    '#....#..#.#....#..#.#..#.#....#....#..#.',
+    '####..###.####.#..#.###..####.#.....##..',
+]
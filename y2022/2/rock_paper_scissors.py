@@ -1,4 +1,13 @@
+import mmap
+import os
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
 from enum import Enum
+from functools import cached_property
+from typing import Callable, Dict, Iterable, Optional, TextIO, Tuple
+
+import numpy as np
 
 
 class Choices(Enum):
@@ -51,18 +60,21 @@ class Choices(Enum):
         return self.beats[other] == self
 
 
-def points_counter(player_1_move: str, player_2_move: str):
-    player_2_choice = Choices(player_2_move)
-    player_1_choice = player_2_choice.move_to_win(player_1_move)
-
-    if player_1_choice > player_2_choice:
+def battle_points(my_choice: Choices, their_choice: Choices):
+    if my_choice > their_choice:
         points_for_battle = 6
-    elif player_1_choice == player_2_choice:
+    elif my_choice == their_choice:
         points_for_battle = 3
     else:
         points_for_battle = 0
 
-    return player_1_choice.points + points_for_battle
+    return my_choice.points + points_for_battle
+
+
+def points_counter(player_1_move: str, player_2_move: str):
+    player_2_choice = Choices(player_2_move)
+    player_1_choice = player_2_choice.move_to_win(player_1_move)
+    return battle_points(player_1_choice, player_2_choice)
 
 
 assert points_counter('Y', 'A') == 4
@@ -72,17 +84,121 @@ assert points_counter('Z', 'C') == 7
 assert points_counter('Y', 'A') + points_counter('X', 'B') + points_counter('Z', 'C') == 12
 
 
-with open('input.txt') as file, open('output.txt', 'w') as file2:
-    points_sum = 0
-    round = 1
-    for line in file.readlines():
-        theirmove, mymove = line.split(' ')
-        mymove = mymove.rstrip('\n')
+MY_MOVES = ('X', 'Y', 'Z')
+ROUND_LINES = tuple(f'{their_choice.value} {my_move}' for their_choice in Choices for my_move in MY_MOVES)
+
+Strategy = Callable[[Choices, str], Choices]
+
+
+def move_as_choice(their_choice: Choices, my_move: str) -> Choices:
+    return list(Choices)[MY_MOVES.index(my_move)]
+
+
+def move_as_outcome(their_choice: Choices, my_move: str) -> Choices:
+    return their_choice.move_to_win(my_move)
+
+
+@dataclass(frozen=True)
+class ScoreTable:
+    points: Tuple[int, ...]
+
+    @classmethod
+    def for_strategy(cls, strategy: Strategy):
+        return cls(tuple(
+            battle_points(strategy(their_choice, my_move), their_choice)
+            for their_choice in Choices for my_move in MY_MOVES
+        ))
+
+    @cached_property
+    def by_line(self) -> Dict[str, int]:
+        return dict(zip(ROUND_LINES, self.points))
+
+    @cached_property
+    def output_by_line(self) -> Dict[str, str]:
+        return {line: f'{points}\n' for line, points in self.by_line.items()}
+
+    def score(self, rounds_count: Dict[str, int]):
+        return sum(self.by_line[line] * count for line, count in rounds_count.items())
+
+
+CHOICE_TABLE = ScoreTable.for_strategy(move_as_choice)
+OUTCOME_TABLE = ScoreTable.for_strategy(move_as_outcome)
+
+assert len(CHOICE_TABLE.points) == len(OUTCOME_TABLE.points) == 9
+assert OUTCOME_TABLE.by_line['A Y'] == points_counter('Y', 'A')
+assert CHOICE_TABLE.by_line['A Y'] == 8
+
+
+def count_rounds(lines: Iterable[str], output: Optional[TextIO] = None, block_size: int = 4096) -> Counter:
+    """Count every distinct round line. Per-round outcome points go to `output` in blocks of `block_size`."""
+    rounds_count = Counter()
+    output_by_line = OUTCOME_TABLE.output_by_line
+    block = []
+    for line in lines:
+        round_line = line.rstrip('\n')
+        rounds_count[round_line] += 1
+        if output:
+            block.append(output_by_line[round_line])
+            if len(block) == block_size:
+                output.write(''.join(block))
+                block.clear()
+
+    if output and block:
+        output.write(''.join(block))
+    return rounds_count
+
+
+def score_strategy_guide(file_name: str, output_file_name: str = None) -> Tuple[int, int]:
+    """Points for reading the guide as choices and as outcomes, from one pass over the file."""
+    with open(file_name) as file, (open(output_file_name, 'w') if output_file_name else nullcontext()) as output:
+        rounds_count = count_rounds(file, output)
+    return CHOICE_TABLE.score(rounds_count), OUTCOME_TABLE.score(rounds_count)
+
+
+test_rounds_count = count_rounds(['A Y\n', 'B X\n', 'C Z'])
+assert CHOICE_TABLE.score(test_rounds_count) == 15
+assert OUTCOME_TABLE.score(test_rounds_count) == 12
+
+
+RECORD_SIZE = 4
+ROUND_POINTS = np.array([CHOICE_TABLE.points, OUTCOME_TABLE.points])
+
+
+def score_records(records: np.ndarray, block_rounds: int = 1 << 20) -> Optional[Tuple[int, int]]:
+    """Both strategies' points for an (n, 4) uint8 view of 'A X' lines, or None if any record is malformed."""
+    totals = np.zeros(2, dtype=np.int64)
+    for start in range(0, len(records), block_rounds):
+        block = records[start:start + block_rounds]
+        their_choice = block[:, 0] - np.uint8(ord('A'))
+        my_move = block[:, 2] - np.uint8(ord('X'))
+        well_formed = (their_choice < 3) & (my_move < 3) & (block[:, 1] == ord(' ')) & (block[:, 3] == ord('\n'))
+        if not well_formed.all():
+            return None
+        totals += ROUND_POINTS[:, their_choice * 3 + my_move].sum(axis=1)
+    return int(totals[0]), int(totals[1])
+
+
+def score_strategy_guide_mmap(file_name: str) -> Tuple[int, int]:
+    """Same result as score_strategy_guide, read straight from the memory-mapped file when it is all 4-byte records."""
+    size = os.path.getsize(file_name)
+    if size == 0:
+        return 0, 0
+
+    scores = None
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+        if size % RECORD_SIZE == 0 and memory[-1:] == b'\n':
+            scores = score_records(np.frombuffer(memory, dtype=np.uint8).reshape(-1, RECORD_SIZE))
 
-        file2.writelines(f'{points_counter(mymove, theirmove)}\n')
-        points_sum += points_counter(mymove, theirmove)
+    if scores is None:
+        return score_strategy_guide(file_name)
+    return scores
 
-        round += 1
 
+test_records = np.frombuffer(b'A Y\nB X\nC Z\n', dtype=np.uint8).reshape(-1, RECORD_SIZE)
+assert score_records(test_records) == (15, 12)
+assert score_records(test_records, block_rounds=2) == (15, 12)
+assert score_records(np.frombuffer(b'A Y\nB W\n', dtype=np.uint8).reshape(-1, RECORD_SIZE)) is None
 
 
+choice_points_sum, points_sum = score_strategy_guide('input.txt', 'output.txt')
+assert score_strategy_guide_mmap('input.txt') == (choice_points_sum, points_sum)
@@ -1,7 +1,12 @@
-from collections import Counter
+import os
+import string
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from itertools import chain
-from typing import List
+from functools import reduce
+from itertools import chain, islice
+from operator import and_
+from typing import Iterable, Iterator, List, Optional
 
 
 @dataclass(frozen=True)
@@ -52,9 +57,10 @@ class Backpack:
 @dataclass
 class ElvGroup:
     backpacks: List[Backpack] = field(default_factory=list)
+    size: int = 3
 
     def is_full(self):
-        return len(self.backpacks) == 3
+        return len(self.backpacks) == self.size
 
     def get_backpack_unique_items(self):
         for backpack in self.backpacks:
@@ -64,7 +70,7 @@ class ElvGroup:
     @property
     def badge(self):
         counted_items = Counter(self.get_backpack_unique_items())
-        return list(counted_items.keys())[list(counted_items.values()).index(3)]
+        return list(counted_items.keys())[list(counted_items.values()).index(self.size)]
 
 
 test_1_group = ElvGroup([
@@ -86,6 +92,108 @@ assert test_2_group.badge.points == 52
 assert test_1_group.badge.points + test_2_group.badge.points == 70
 
 
+ITEMS_BY_PRIORITY = {Item(letter).points: Item(letter) for letter in string.ascii_letters}
+PRIORITIES = {item.name: priority for priority, item in ITEMS_BY_PRIORITY.items()}
+
+
+def items_mask(contents: str) -> int:
+    """Items as a 52-bit int, with bit `priority - 1` set for every item present."""
+    return sum(1 << (PRIORITIES[letter] - 1) for letter in set(contents))
+
+
+def lowest_item(mask: int) -> Optional[Item]:
+    return ITEMS_BY_PRIORITY.get((mask & -mask).bit_length())
+
+
+assert items_mask('aAa') == 1 | 1 << 26
+assert lowest_item(items_mask('Za')) == Item('a')
+assert lowest_item(0) is None
+
+
+@dataclass(frozen=True)
+class MaskBackpack:
+    first_compartment: int
+    second_compartment: int
+
+    @classmethod
+    def from_contents(cls, contents: str):
+        half = len(contents) // 2
+        return cls(items_mask(contents[:half]), items_mask(contents[half:]))
+
+    @property
+    def unique_items(self) -> int:
+        return self.first_compartment | self.second_compartment
+
+    @property
+    def doubled_item(self):
+        return lowest_item(self.first_compartment & self.second_compartment)
+
+
+@dataclass
+class MaskElvGroup:
+    backpacks: List[MaskBackpack] = field(default_factory=list)
+    size: int = 3
+
+    def is_full(self):
+        return len(self.backpacks) == self.size
+
+    @property
+    def badge(self):
+        return lowest_item(reduce(and_, (backpack.unique_items for backpack in self.backpacks)))
+
+
+assert MaskBackpack.from_contents('vJrwpWtwJgWrhcsFMMfFFhFp').doubled_item == Backpack('vJrwpWtwJgWrhcsFMMfFFhFp').doubled_item
+assert MaskElvGroup([MaskBackpack.from_contents(backpack.contents) for backpack in test_1_group.backpacks]).badge == Item('r')
+assert MaskElvGroup([MaskBackpack.from_contents(backpack.contents) for backpack in test_2_group.backpacks]).badge == Item('Z')
+assert MaskElvGroup([MaskBackpack.from_contents('abc'), MaskBackpack.from_contents('cd')], size=2).badge == Item('c')
+
+
+def group_lines(lines: Iterable[str], group_size: int = 3) -> Iterator[List[str]]:
+    """Backpack contents grouped by `group_size`, read lazily. A trailing incomplete group is dropped."""
+    group = []
+    for line in lines:
+        group.append(line.rstrip('\n'))
+        if len(group) == group_size:
+            yield group
+            group = []
+
+
+def batched(items: Iterable, batch_size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def batch_badge_points(groups: List[List[str]]) -> int:
+    return sum(
+        MaskElvGroup([MaskBackpack.from_contents(contents) for contents in group], len(group)).badge.points
+        for group in groups
+    )
+
+
+def parallel_badge_points(file_name: str, group_size: int = 3, batch_groups: int = 10000, workers: int = None) -> int:
+    """Sum of badge priorities, with batches of groups scored in a process pool.
+
+    At most two batches per worker are in flight, so memory stays bounded whatever the file size.
+    """
+    workers = workers or os.cpu_count()
+    items_priority_sum = 0
+    pending = deque()
+    with open(file_name) as file, ProcessPoolExecutor(workers) as executor:
+        for batch in batched(group_lines(file, group_size), batch_groups):
+            if len(pending) >= 2 * workers:
+                items_priority_sum += pending.popleft().result()
+            pending.append(executor.submit(batch_badge_points, batch))
+
+        items_priority_sum += sum(future.result() for future in pending)
+    return items_priority_sum
+
+
+assert list(group_lines(['a\n', 'b\n', 'c\n', 'd\n'], 2)) == [['a', 'b'], ['c', 'd']]
+assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+assert batch_badge_points([[backpack.contents for backpack in test_1_group.backpacks]]) == 18
+
+
 with open('input.txt') as file:
 
     items_priority_sum = 0
@@ -105,3 +213,21 @@ with open('input.txt') as file:
 assert len(groups) == 100
 
 
+with open('input.txt') as file:
+
+    mask_items_priority_sum = 0
+    mask_group = MaskElvGroup()
+
+    for line in file:
+        mask_group.backpacks.append(MaskBackpack.from_contents(line.rstrip('\n')))
+
+        if mask_group.is_full():
+            mask_items_priority_sum += mask_group.badge.points
+            mask_group = MaskElvGroup()
+
+assert mask_items_priority_sum == items_priority_sum
+
+if __name__ == '__main__':
+    assert parallel_badge_points('input.txt', batch_groups=7, workers=4) == items_priority_sum
+
+
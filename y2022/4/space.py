@@ -1,6 +1,11 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass, field, InitVar
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 
 @dataclass
@@ -8,32 +13,60 @@ class Section:
     id: int
 
 
-@dataclass
-class Assignment:
-    sections_range: str
+class Sections(Sequence):
+    """Sections of a range, created on access, so an assignment never holds one object per section."""
 
-    @property
-    def start(self):
-        return int(self.sections_range.split('-')[0])
+    def __init__(self, ids: range):
+        self.ids = ids
 
-    @property
-    def end(self):
-        return int(self.sections_range.split('-')[1])
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Sections(self.ids[index])
+        return Section(self.ids[index])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __eq__(self, other):
+        if isinstance(other, Sections):
+            return self.ids == other.ids
+        if isinstance(other, Sequence):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f'Sections({self.ids!r})'
+
+
+@dataclass(slots=True)
+class Assignment:
+    sections_range: InitVar[str]
+    start: int = field(init=False)
+    end: int = field(init=False)
+
+    def __post_init__(self, sections_range: str):
+        start, end = sections_range.split('-')
+        self.start = int(start)
+        self.end = int(end)
 
     @property
-    def sections(self):
-        return [Section(section) for section in range(self.start, self.end+1)]
+    def sections(self) -> Sections:
+        return Sections(range(self.start, self.end+1))
 
     def contains_another_assignment(self, other: Assignment):
-        return all(section in self.sections for section in other.sections)
+        return self.start <= other.start and other.end <= self.end
 
     def overlap_another_assignment(self, other: Assignment):
-        return any(section in self.sections for section in other.sections)
+        return self.start <= other.end and other.start <= self.end
 
 
 assert Assignment('1-3').sections == [Section(1), Section(2), Section(3)]
+assert len(Assignment('1-3').sections) == 3 and Assignment('3-2').sections == []
 assert Assignment('1-3').contains_another_assignment(Assignment('2-2'))
+assert not Assignment('2-2').contains_another_assignment(Assignment('1-3'))
 assert not Assignment('7-91').overlap_another_assignment(Assignment('1-6'))
+assert Assignment('5-7').overlap_another_assignment(Assignment('7-9'))
+assert Assignment('1-3') == Assignment('1-3')
 
 
 @dataclass
@@ -57,15 +90,126 @@ class Pair:
         return self.first_elv_assignment.overlap_another_assignment(self.second_elv_assignment)\
                or self.second_elv_assignment.overlap_another_assignment(self.first_elv_assignment)
 
+    def contains(self):
+        return self.first_elv_assignment.contains_another_assignment(self.second_elv_assignment)\
+               or self.second_elv_assignment.contains_another_assignment(self.first_elv_assignment)
+
 
 test_pair = Pair('2-8,3-7')
 assert test_pair.first_elv_assignment.sections == [Section(i) for i in range(2, 9)]
 
 
+def load_bounds(data: bytes) -> np.ndarray:
+    """(n, 4) array of first start, first end, second start, second end for every pair line."""
+    return np.array(re.findall(rb'\d+', data)).astype(np.int64).reshape(-1, 4)
+
+
+def count_pairs(bounds: np.ndarray) -> Tuple[int, int]:
+    """Number of pairs where one assignment contains the other, and number of overlapping pairs."""
+    first_start, first_end, second_start, second_end = bounds.T
+    contained = ((first_start <= second_start) & (second_end <= first_end))\
+        | ((second_start <= first_start) & (first_end <= second_end))
+    overlapping = (first_start <= second_end) & (second_start <= first_end)
+    return int(contained.sum()), int(overlapping.sum())
+
+
+test_bounds = load_bounds(b'2-4,6-8\n2-3,4-5\n5-7,7-9\n2-8,3-7\n6-6,4-6\n2-6,4-8\n')
+assert test_bounds.shape == (6, 4)
+assert count_pairs(test_bounds) == (2, 4)
+assert count_pairs(load_bounds(b'')) == (0, 0)
+
+
+class AssignmentIndex:
+    """Every assignment of a file, sorted by start, with a max-end tree over that order.
+
+    Assignment indexes follow input order, two per line: index // 2 is the pair, index % 2 the elf in it.
+    """
+
+    def __init__(self, assignments: List[Assignment]):
+        self.assignments = assignments
+        self.order = sorted(range(len(assignments)), key=lambda index: assignments[index].start)
+        self.starts = [assignments[index].start for index in self.order]
+        self.ends = sorted(assignment.end for assignment in assignments)
+
+        self.leaves = 1 << max(len(assignments) - 1, 0).bit_length()
+        self.max_ends = [-1] * (2 * self.leaves)
+        for position, index in enumerate(self.order):
+            self.max_ends[self.leaves + position] = assignments[index].end
+        for node in reversed(range(1, self.leaves)):
+            self.max_ends[node] = max(self.max_ends[2 * node], self.max_ends[2 * node + 1])
+
+        self.max_concurrent, self.busiest_section = self.sweep()
+
+    @classmethod
+    def from_file(cls, file_name: str):
+        assignments = []
+        with open(file_name) as file:
+            for line in file:
+                pair = Pair(line)
+                assignments += [pair.first_elv_assignment, pair.second_elv_assignment]
+        return cls(assignments)
+
+    def sweep(self) -> Tuple[int, Optional[int]]:
+        """Most assignments covering one section, and the first section where that happens."""
+        max_concurrent, busiest_section = 0, None
+        for position, start in enumerate(self.starts):
+            concurrent = position + 1 - bisect_left(self.ends, start)
+            if concurrent > max_concurrent:
+                max_concurrent, busiest_section = concurrent, start
+        return max_concurrent, busiest_section
+
+    def count_covering(self, section: int) -> int:
+        return bisect_right(self.starts, section) - bisect_left(self.ends, section)
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Indexes of assignments sharing at least one section with start-end."""
+        candidates = bisect_right(self.starts, end)
+        found = []
+        nodes = [(1, 0, self.leaves)]
+        while nodes:
+            node, low, high = nodes.pop()
+            if low >= candidates or self.max_ends[node] < start:
+                continue
+            if node >= self.leaves:
+                found.append(self.order[low])
+                continue
+            middle = (low + high) // 2
+            nodes += [(2 * node, low, middle), (2 * node + 1, middle, high)]
+        return sorted(found)
+
+    def covering(self, section: int) -> List[int]:
+        return self.overlapping(section, section)
+
+
+test_index = AssignmentIndex([Assignment(sections_range) for sections_range in ['2-4', '6-8', '2-3', '4-5', '5-7', '7-9']])
+assert test_index.covering(4) == [0, 3]
+assert test_index.count_covering(4) == 2
+assert test_index.covering(1) == []
+assert test_index.overlapping(5, 6) == [1, 3, 4]
+assert (test_index.max_concurrent, test_index.busiest_section) == (3, 7)
+assert AssignmentIndex([]).covering(1) == []
+
+
 with open('input.txt') as file:
 
     counter = 0
+    contains_counter = 0
     for line in file.readlines():
         pair = Pair(line)
         if pair.overlap():
             counter += 1
+        if pair.contains():
+            contains_counter += 1
+
+with open('input.txt', 'rb') as file:
+    assert count_pairs(load_bounds(file.read())) == (contains_counter, counter)
+
+input_index = AssignmentIndex.from_file('input.txt')
+with open('input.txt') as file:
+    for index, line in enumerate(file):
+        pair = Pair(line)
+        first = pair.first_elv_assignment
+        assert input_index.assignments[2 * index:2 * index + 2] == [first, pair.second_elv_assignment]
+        assert (2 * index + 1 in input_index.overlapping(first.start, first.end)) == pair.overlap()
+assert len(input_index.covering(input_index.busiest_section)) == input_index.max_concurrent
+assert input_index.count_covering(input_index.busiest_section) == input_index.max_concurrent
@@ -1,5 +1,7 @@
+from __future__ import annotations
 import re
 from dataclasses import dataclass, field
+from enum import Enum
 from functools import cached_property
 from typing import List, Dict, Tuple, Optional
 
@@ -83,6 +85,138 @@ class Cargo:
         return name
 
 
+class CrateMover(Enum):
+    CM9000 = 9000
+    CM9001 = 9001
+
+
+@dataclass(slots=True)
+class CrateSegment:
+    """Crates start:end of an immutable bytes buffer shared with other segments, read top-down when reversed."""
+    crates: bytes
+    start: int
+    end: int
+    reversed: bool = False
+
+    def __len__(self):
+        return self.end - self.start
+
+    def split_top(self, number_of_crates: int) -> CrateSegment:
+        """Cuts the top crates off into a new segment over the same bytes, without copying them."""
+        if self.reversed:
+            top = CrateSegment(self.crates, self.start, self.start + number_of_crates, True)
+            self.start += number_of_crates
+        else:
+            top = CrateSegment(self.crates, self.end - number_of_crates, self.end)
+            self.end -= number_of_crates
+        return top
+
+    def extends(self, other: CrateSegment) -> bool:
+        """Whether `other`, placed on top of this segment, continues it in the same bytes."""
+        if other.crates is not self.crates or other.reversed != self.reversed:
+            return False
+        return other.end == self.start if self.reversed else other.start == self.end
+
+    def top_element_name(self):
+        return chr(self.crates[self.start] if self.reversed else self.crates[self.end - 1])
+
+    def names(self) -> bytes:
+        names = self.crates[self.start:self.end]
+        return names[::-1] if self.reversed else names
+
+
+class CrateStacks:
+    """Every stack as a list of CrateSegments, bottom first.
+
+    A move re-links segments instead of copying crates: at most one segment is split, CrateMover 9000 only flips
+    the moved segments' reversed flag, and a segment that continues the one below it is merged back into it.
+    The cost of a move is the number of segments it crosses, whatever the number of crates. That is a per-move
+    cost, not an amortised one: moving a fragmented pile back and forth pays for its segments every time.
+    """
+
+    def __init__(self, stacks: Dict[int, bytes]):
+        self.stacks: Dict[int, List[CrateSegment]] = {
+            index: [CrateSegment(bytes(crates), 0, len(crates))] if crates else []
+            for index, crates in stacks.items()
+        }
+        self.sizes = {index: len(crates) for index, crates in stacks.items()}
+
+    @classmethod
+    def from_cargo(cls, cargo: Cargo):
+        return cls({
+            index: ''.join(crate.name for crate in stack.crates).encode('ascii')
+            for index, stack in cargo.stacks.items()
+        })
+
+    def push(self, stack_index: int, segment: CrateSegment):
+        stack = self.stacks[stack_index]
+        if stack and stack[-1].extends(segment):
+            if segment.reversed:
+                stack[-1].start = segment.start
+            else:
+                stack[-1].end = segment.end
+        else:
+            stack.append(segment)
+
+    def move(self, number_of_crates: int, from_stack_index: int, to_stack_index: int, mover: CrateMover):
+        if from_stack_index == to_stack_index:
+            return
+
+        source = self.stacks[from_stack_index]
+        number_of_crates = min(number_of_crates, self.sizes[from_stack_index])
+        if not number_of_crates:
+            return
+
+        moved = []
+        remaining = number_of_crates
+        while remaining:
+            if len(source[-1]) <= remaining:
+                moved.append(source.pop())
+            else:
+                moved.append(source[-1].split_top(remaining))
+            remaining -= len(moved[-1])
+
+        if mover == CrateMover.CM9000:
+            for segment in moved:
+                segment.reversed = not segment.reversed
+        else:
+            moved.reverse()
+
+        for segment in moved:
+            self.push(to_stack_index, segment)
+        self.sizes[from_stack_index] -= number_of_crates
+        self.sizes[to_stack_index] += number_of_crates
+
+    def stack_names(self, stack_index: int) -> str:
+        return b''.join(segment.names() for segment in self.stacks[stack_index]).decode('ascii')
+
+    def top_elements_name(self):
+        return ''.join(stack[-1].top_element_name() for stack in self.stacks.values() if stack)
+
+
+test_stacks = CrateStacks({1: b'ZN', 2: b'MCD', 3: b'P'})
+for test_move in [(1, 2, 1), (3, 1, 3), (2, 2, 1), (1, 1, 2)]:
+    test_stacks.move(*test_move, CrateMover.CM9000)
+assert test_stacks.top_elements_name() == 'CMZ'
+assert [test_stacks.stack_names(index) for index in (1, 2, 3)] == ['C', 'M', 'PDNZ']
+
+test_stacks = CrateStacks({1: b'ZN', 2: b'MCD', 3: b'P'})
+for test_move in [(1, 2, 1), (3, 1, 3), (2, 2, 1), (1, 1, 2)]:
+    test_stacks.move(*test_move, CrateMover.CM9001)
+assert test_stacks.top_elements_name() == 'MCD'
+assert [test_stacks.stack_names(index) for index in (1, 2, 3)] == ['M', 'C', 'PZND']
+
+test_stacks = CrateStacks({1: b'ABCDEF', 2: b''})
+test_stacks.move(2, 1, 2, CrateMover.CM9001)
+test_stacks.move(2, 2, 1, CrateMover.CM9001)
+assert len(test_stacks.stacks[1]) == 1 and test_stacks.stack_names(1) == 'ABCDEF'
+
+for test_mover in CrateMover:
+    test_stacks = CrateStacks({1: b'ABC'})
+    test_stacks.move(2, 1, 1, test_mover)
+    assert test_stacks.stack_names(1) == 'ABC' and test_stacks.sizes[1] == 3
+
+
 @dataclass
 class Operations:
     number_of_crates: int
@@ -93,9 +227,67 @@ class Operations:
         crates = cargo.stacks[self.from_stack_index].move_from_stack(self.number_of_crates)
         cargo.stacks[self.to_stack_index].add_to_stack(crates)
 
+    def perform_on_stacks(self, stacks: CrateStacks, mover: CrateMover = CrateMover.CM9001):
+        stacks.move(self.number_of_crates, self.from_stack_index, self.to_stack_index, mover)
+
+    def trace_back(self, stack_index: int, depth: int, moved: int, mover: CrateMover) -> Tuple[int, int]:
+        """Stack and depth from the top a crate had before this operation moved `moved` crates."""
+        in_moved_crates = depth < moved
+        if self.from_stack_index == self.to_stack_index:
+            return stack_index, depth
+
+        if stack_index == self.to_stack_index:
+            if not in_moved_crates:
+                return stack_index, depth - moved
+            if mover == CrateMover.CM9000:
+                return self.from_stack_index, moved - 1 - depth
+            return self.from_stack_index, depth
+
+        if stack_index == self.from_stack_index:
+            return stack_index, depth + moved
+        return stack_index, depth
+
+
+def reverse_trace_top_elements_name(cargo: Cargo, operations: List[Operations], mover: CrateMover) -> str:
+    """Same as top_elements_name() after all operations, without moving any crates.
+
+    Only stack heights go forward through the operations; each final top position is then walked back
+    through them to the crate it started as.
+    """
+    heights = {index: stack.size for index, stack in cargo.stacks.items()}
+    moved_counts = []
+    for operation in operations:
+        moved = min(operation.number_of_crates, heights[operation.from_stack_index])
+        heights[operation.from_stack_index] -= moved
+        heights[operation.to_stack_index] += moved
+        moved_counts.append(moved)
+
+    positions = {index: (index, 0) for index, height in heights.items() if height}
+    for operation, moved in zip(reversed(operations), reversed(moved_counts)):
+        for index, (stack_index, depth) in positions.items():
+            positions[index] = operation.trace_back(stack_index, depth, moved, mover)
+
+    name = ''
+    for stack_index, depth in positions.values():
+        name += cargo.stacks[stack_index].crates[-1 - depth].name
+    return name
+
 
 initial_cargo = Cargo('cargo.txt')
 initial_cargo.load_crates()
+crate_stacks_9000 = CrateStacks.from_cargo(initial_cargo)
+crate_stacks_9001 = CrateStacks.from_cargo(initial_cargo)
+
+
+test_cargo = Cargo('test')
+test_cargo.stacks = {1: Stack([Crate('Z'), Crate('N')]), 2: Stack([Crate('M'), Crate('C'), Crate('D')]), 3: Stack([Crate('P')])}
+test_operations = [Operations(1, 2, 1), Operations(3, 1, 3), Operations(2, 2, 1), Operations(1, 1, 2)]
+assert reverse_trace_top_elements_name(test_cargo, test_operations, CrateMover.CM9000) == 'CMZ'
+assert reverse_trace_top_elements_name(test_cargo, test_operations, CrateMover.CM9001) == 'MCD'
+for test_mover in CrateMover:
+    assert reverse_trace_top_elements_name(test_cargo, [Operations(2, 2, 2)], test_mover) == 'NDP'
+    assert reverse_trace_top_elements_name(test_cargo, test_operations + [Operations(2, 3, 3)], test_mover) == \
+        reverse_trace_top_elements_name(test_cargo, test_operations, test_mover)
 
 
 def load_operations(file_name: str) -> List[Operations]:
@@ -114,3 +306,14 @@ for operation in operations:
 
 print(initial_cargo.top_elements_name())
 
+for operation in operations:
+    operation.perform_on_stacks(crate_stacks_9000, CrateMover.CM9000)
+    operation.perform_on_stacks(crate_stacks_9001, CrateMover.CM9001)
+
+assert crate_stacks_9001.top_elements_name() == initial_cargo.top_elements_name()
+print(crate_stacks_9000.top_elements_name())
+
+traced_cargo = Cargo('cargo.txt')
+traced_cargo.load_crates()
+assert reverse_trace_top_elements_name(traced_cargo, operations, CrateMover.CM9000) == crate_stacks_9000.top_elements_name()
+assert reverse_trace_top_elements_name(traced_cargo, operations, CrateMover.CM9001) == crate_stacks_9001.top_elements_name()
@@ -1,6 +1,9 @@
 from dataclasses import dataclass, field
-from functools import cached_property
-from typing import Optional, List
+from functools import cached_property, partial
+from typing import Optional, List, Iterable, Iterator, Tuple, Union, BinaryIO
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 @dataclass
@@ -15,10 +18,121 @@ class Group:
         return self.index < other.index
 
 
+class MarkerScanner:
+    """Marker search state carried from chunk to chunk: where every symbol was last seen and where the current
+    all-different run starts. One run serves every window size, as a run of length n holds a marker for each size <= n.
+    """
+
+    def __init__(self, window_sizes: Iterable[int] = (4, 14), all_markers: bool = False):
+        self.waiting = sorted(set(window_sizes))
+        self.all_markers = all_markers
+        self.position = 0
+        self.distinct_from = 0
+        self.last_seen = {}
+
+    @property
+    def done(self):
+        return not self.all_markers and not self.waiting
+
+    def feed(self, symbols: Union[str, bytes]) -> Iterator[Tuple[int, int]]:
+        """(window size, marker) for every marker completed inside `symbols`, in stream order."""
+        last_seen = self.last_seen
+        for symbol in symbols:
+            if last_seen.get(symbol, -1) >= self.distinct_from:
+                self.distinct_from = last_seen[symbol] + 1
+            last_seen[symbol] = self.position
+            self.position += 1
+
+            run = self.position - self.distinct_from
+            if self.all_markers:
+                for window_size in self.waiting:
+                    if window_size > run:
+                        break
+                    yield window_size, self.position
+            else:
+                while self.waiting and self.waiting[0] <= run:
+                    yield self.waiting.pop(0), self.position
+                if not self.waiting:
+                    return
+
+
+def first_marker(stream: str, window_size: int) -> Optional[int]:
+    """Characters read when the last `window_size` of them are all different, in one pass, or None."""
+    for _, marker in MarkerScanner([window_size]).feed(stream):
+        return marker
+    return None
+
+
+assert first_marker('mjqjpqmgbljsphdztnvjfqwrcgsmlb', 4) == 7
+assert first_marker('mjqjpqmgbljsphdztnvjfqwrcgsmlb', 14) == 19
+assert first_marker('bvwbjplbgvbhsrlpgdmjqwftvncz', 4) == 5
+assert first_marker('aaaa', 2) is None
+
+
+def first_marker_numpy(stream: Union[bytes, np.ndarray], window_size: int, block_size: int = 1 << 16) -> Optional[int]:
+    """Same as first_marker, checking `block_size` windows at a time in NumPy.
+
+    Within a block, each symbol gets the position of its previous occurrence (-1 if none), found by a stable
+    argsort on symbol. The window starting at j has no repeats iff every previous occurrence in it is before j.
+    """
+    symbols = np.frombuffer(stream, dtype=np.uint8) if isinstance(stream, bytes) else stream
+    for start in range(0, len(symbols) - window_size + 1, block_size):
+        block = symbols[start:start + block_size + window_size - 1]
+        order = np.argsort(block, kind='stable')
+        same_symbol = block[order[1:]] == block[order[:-1]]
+        previous = np.empty(len(block), dtype=np.int64)
+        previous[order] = np.concatenate(([-1], np.where(same_symbol, order[:-1], -1)))
+
+        latest_repeat = sliding_window_view(previous, window_size).max(axis=1)
+        distinct = latest_repeat < np.arange(len(latest_repeat))
+        if distinct.any():
+            return start + int(distinct.argmax()) + window_size
+    return None
+
+
+def first_markers_numpy(streams: Iterable[bytes], window_size: int) -> List[Optional[int]]:
+    return [first_marker_numpy(stream, window_size) for stream in streams]
+
+
+assert first_marker_numpy(b'mjqjpqmgbljsphdztnvjfqwrcgsmlb', 4) == 7
+assert first_marker_numpy(b'mjqjpqmgbljsphdztnvjfqwrcgsmlb', 14, block_size=5) == 19
+assert first_markers_numpy([b'bvwbjplbgvbhsrlpgdmjqwftvncz', b'aaaa', b'ab'], 4) == [5, None, None]
+for test_stream in ['mjqjpqmgbljsphdztnvjfqwrcgsmlb', 'nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg', 'aaaaaaaaaaab', 'abcabc']:
+    for test_window in [1, 2, 4, 14]:
+        for test_block in [1, 2, 3, 7, 1 << 16]:
+            assert first_marker_numpy(test_stream.encode(), test_window, test_block) == \
+                first_marker(test_stream, test_window)
+
+
 @dataclass
 class Signal:
     stream: str
 
+    @property
+    def packet_marker(self) -> Optional[int]:
+        return first_marker(self.stream, 4)
+
+    @property
+    def message_marker(self) -> Optional[int]:
+        return first_marker(self.stream, 14)
+
+    def first_marker_numpy(self, window_size: int) -> Optional[int]:
+        return first_marker_numpy(self.stream.encode(), window_size)
+
+    @staticmethod
+    def scan(source: Union[BinaryIO, Iterable[bytes]], window_sizes: Iterable[int] = (4, 14),
+             all_markers: bool = False, chunk_size: int = 1 << 16) -> Iterator[Tuple[int, int]]:
+        """(window size, marker) pairs as soon as they are found, from a binary file or an iterable of byte chunks.
+
+        Stops reading once the first marker of every window size is found, unless all_markers is set.
+        """
+        chunks = iter(partial(source.read, chunk_size), b'') if hasattr(source, 'read') else source
+        scanner = MarkerScanner(window_sizes, all_markers)
+        for chunk in chunks:
+            yield from scanner.feed(chunk.translate(None, b'\r\n'))
+            if scanner.done:
+                return
+
     @cached_property
     def packet_groups(self):
         groups = []
@@ -56,6 +170,14 @@ class Signal:
                 yield Group(i, group_stream)
 
 
+test_chunks = [b'mjq', b'jpq', b'mgb\n', b'ljsphdztnvjfqwrcgsmlb']
+assert list(Signal.scan(test_chunks)) == [(4, 7), (14, 19)]
+assert list(Signal.scan(test_chunks, window_sizes=[14])) == [(14, 19)]
+assert list(Signal.scan([b'abcab'], window_sizes=[2, 3], all_markers=True)) == [
+    (2, 2), (2, 3), (3, 3), (2, 4), (3, 4), (2, 5), (3, 5)
+]
+
+
 def load_stream(file_name: str) -> str:
     stream = ''
     with open(file_name) as file:
@@ -71,4 +193,13 @@ stream = load_stream('input.txt')
 
 signal = Signal(stream)
 print(signal.packet_starting_group)
-print(signal.message_starting_group)
\ No newline at end of file
+print(signal.message_starting_group)
+
+assert signal.packet_marker == signal.packet_starting_group.index
+assert signal.message_marker == signal.message_starting_group.index
+
+with open('input.txt', 'rb') as file:
+    assert list(Signal.scan(file, chunk_size=1000)) == [(4, signal.packet_marker), (14, signal.message_marker)]
+
+assert signal.first_marker_numpy(4) == signal.packet_marker
+assert signal.first_marker_numpy(14) == signal.message_marker
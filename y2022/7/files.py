@@ -1,8 +1,10 @@
 from __future__ import annotations
 import abc
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from functools import cached_property
-from typing import List, Set
+from itertools import accumulate
+from typing import Dict, List, Set, Iterable, Iterator, Union, Optional
 
 
 class FileInterface:
@@ -12,7 +14,7 @@ class FileInterface:
 
 class File(FileInterface):
     def __init__(self, size: int, *args):
-        self.size = size
+        self.size = int(size)
         super().__init__(*args)
 
 
@@ -20,19 +22,23 @@ class Folder(FileInterface):
     def __init__(self, master: Folder = None, *args):
         super().__init__(*args)
         self.master = master
-        self.files: List[FileInterface] = []
+        self.files: Dict[str, FileInterface] = {}
+        self.size = 0
 
-    @property
-    def size(self):
-        return sum(int(file.size) for file in self.files)
+    def add_file(self, file: FileInterface):
+        if file.name in self.files:
+            return
+
+        self.files[file.name] = file
+        folder = self
+        while folder:
+            folder.size += file.size
+            folder = folder.master
 
     def get_file_by_name(self, name: str):
-        files_with_name = [file for file in self.files if file.name == name]
-        if not files_with_name:
+        if name not in self.files:
             raise ValueError(f'File with name: {name} not found in folder {self.name}')
-        if len(files_with_name) > 1:
-            raise ValueError(f'Multiple files found with name: {name}')
-        return files_with_name[0]
+        return self.files[name]
 
     def __lt__(self, other):
         return self.size < other.size
@@ -53,78 +59,126 @@ class LS(Command):
     result: List[FileInterface] = field(default_factory=list)
 
 
-class CommandLine:
-    line: str
-    os: OS
+@dataclass
+class DirEntry:
+    name: str
+
+
+@dataclass
+class FileEntry:
+    size: int
+    name: str
+
+    def __post_init__(self):
+        self.size = int(self.size)
 
+
+class CommandLine:
     DEFINED_TYPES = {
         '$ cd': CD,
         '$ ls': LS,
-        'dir': Folder
+        'dir': DirEntry
     }
-    DEFAULT_TYPE = File
+    DEFAULT_TYPE = FileEntry
 
-    def __new__(cls, os, line):
-        cls.line = line
-        cls.os = os
-        return cls.get_command()
-
-    @classmethod
-    def get_arguments(cls, prefix: str = None) -> List[str]:
+    @staticmethod
+    def get_arguments(line: str, prefix: str = None) -> List[str]:
         prefix_len = len(prefix) if prefix else 0
-        line = cls.line[prefix_len:len(cls.line)]
+        line = line[prefix_len:len(line)]
         return [arg for arg in line.split(' ') if arg]
 
     @classmethod
-    def get_command(cls):
+    def parse(cls, line: str):
         for prefix, type in cls.DEFINED_TYPES.items():
-            if cls.line.startswith(prefix):
-                args = cls.get_arguments(prefix)
-                if prefix == 'dir':
-                   args = (cls.os.current_folder, *args)
-                return type(*args)
-        return cls.DEFAULT_TYPE(*cls.get_arguments())
+            if line.startswith(prefix):
+                return type(*cls.get_arguments(line, prefix))
+        return cls.DEFAULT_TYPE(*cls.get_arguments(line))
+
+
+def parse_log(lines: Iterable[str]) -> Iterator[Union[CD, LS, DirEntry, FileEntry]]:
+    """Command and entry records of a terminal log. Keeps no state, so any number of logs can be parsed at once."""
+    for line in lines:
+        yield CommandLine.parse(line.rstrip('\n'))
+
+
+assert list(parse_log(['$ cd a\n', '$ ls', 'dir b', '14848514 b.txt'])) == [
+    CD('a'), LS(), DirEntry('b'), FileEntry(14848514, 'b.txt')
+]
 
 
 class OS:
-    def __init__(self, file_with_commands):
+    def __init__(self, file_with_commands: str = None):
         self.input_file = file_with_commands
-        self.current_folder = Folder(None, '/')
-        self.folders: Set[Folder] = set()
-
-    @cached_property
-    def file(self):
-        return open(self.input_file, 'r')
+        self.root = Folder(None, '/')
+        self.current_folder = self.root
+        self.folders: Set[Folder] = {self.root}
 
     @property
     def files(self):
-        files_files = [folder.files for folder in self.folders]
+        files_files = [folder.files.values() for folder in self.folders]
         return [file for files in files_files for file in files]
 
     @property
     def lines(self):
-        for line in self.file.readlines():
-            command = line.rstrip('\n')
-            yield command
-
-    def process(self):
-        for line in self.lines:
-            commandline = CommandLine(self, line)
-
-            if isinstance(commandline, CD):
-                if commandline.destination == '..':
+        with open(self.input_file) as file:
+            for line in file:
+                yield line
+
+    def process(self, lines: Iterable[str] = None):
+        for record in parse_log(self.lines if lines is None else lines):
+            if isinstance(record, CD):
+                if record.destination == '..':
                     self.current_folder = self.current_folder.master
+                elif record.destination == '/':
+                    self.current_folder = self.root
                 else:
-                    self.current_folder = self.current_folder.get_file_by_name(commandline.destination)
+                    self.current_folder = self.current_folder.get_file_by_name(record.destination)
 
                 self.folders.add(self.current_folder)
                 continue
 
-            if not isinstance(commandline, LS):
-                self.current_folder.files.append(commandline)
+            if isinstance(record, DirEntry):
+                self.current_folder.add_file(Folder(self.current_folder, record.name))
+                continue
+
+            if isinstance(record, FileEntry):
+                self.current_folder.add_file(File(record.size, record.name))
                 continue
 
 
+def load_os(file_name: str) -> OS:
+    os = OS(file_name)
+    os.process()
+    return os
+
+
+def load_sessions(file_names: Iterable[str], executor: Executor) -> List[OS]:
+    """One tree per session log, built concurrently on a thread or process pool."""
+    return list(executor.map(load_os, file_names))
+
+
+class SizeIndex:
+    """Folders of a parsed OS sorted by size once, with prefix sums, for any number of size queries."""
+
+    def __init__(self, os: OS):
+        self.folders = sorted(os.folders)
+        self.sizes = [folder.size for folder in self.folders]
+        self.prefix_sums = [0, *accumulate(self.sizes)]
+
+    def sum_at_most(self, limit: int) -> int:
+        return self.prefix_sums[bisect_right(self.sizes, limit)]
+
+    def smallest_at_least(self, needed: int) -> Optional[Folder]:
+        position = bisect_left(self.sizes, needed)
+        return self.folders[position] if position < len(self.folders) else None
+
+    def largest(self, number: int) -> List[Folder]:
+        return self.folders[:-number-1:-1]
+
+    def count_between(self, low: int, high: int) -> int:
+        return bisect_right(self.sizes, high) - bisect_left(self.sizes, low)
+
+
 os = OS('input.txt')
 os.process()
 
@@ -142,3 +196,34 @@ folders_with_space_above_needed = list(filter(lambda folder: folder.size >= spac
 smallest_dir = min(folders_with_space_above_needed)
 
 
+test_root = Folder(None, '/')
+test_folder = Folder(test_root, 'a')
+test_root.add_file(test_folder)
+test_folder.add_file(File('100', 'b.txt'))
+test_root.add_file(File(20, 'c.txt'))
+test_folder.add_file(File(100, 'b.txt'))
+assert (test_root.size, test_folder.size) == (120, 100)
+assert test_root.get_file_by_name('a') is test_folder
+
+test_os = OS()
+test_os.process(['$ cd /', '$ ls', 'dir a', '14848514 b.txt', '$ cd a', '$ ls', '29116 f'])
+assert (test_os.root.size, len(test_os.folders)) == (14877630, 2)
+
+test_index = SizeIndex(test_os)
+assert test_index.sum_at_most(30000) == 29116
+assert test_index.smallest_at_least(30000) is test_os.root
+assert test_index.smallest_at_least(20000000) is None
+assert test_index.largest(1) == [test_os.root]
+assert test_index.count_between(0, 14877630) == 2
+
+size_index = SizeIndex(os)
+assert size_index.sum_at_most(100000) == result
+assert size_index.smallest_at_least(space_to_free).size == smallest_dir.size
+
+if __name__ == '__main__':
+    with ThreadPoolExecutor(4) as executor:
+        thread_sessions = load_sessions(['input.txt'] * 4, executor)
+    with ProcessPoolExecutor(2) as executor:
+        process_sessions = load_sessions(['input.txt'] * 2, executor)
+    assert all(session.root.size == os.root.size for session in thread_sessions + process_sessions)
+    assert len({id(session.root) for session in thread_sessions}) == 4
@@ -1,22 +1,21 @@
 from __future__ import annotations
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from functools import cached_property
-from typing import List, Iterable
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Iterable, Tuple
+
+import numpy as np
 
 
 @dataclass
 class Tree:
     height: int
     unique_object: object
-    _scenic_score: int = 1
-
-    @property
-    def scenic_score(self):
-        return self._scenic_score
-
-    @scenic_score.setter
-    def scenic_score(self, value):
-        self._scenic_score = self._scenic_score * value
+    scenic_score: int = 0
 
     def __str__(self):
         return f'T{self.height}'
@@ -44,28 +43,6 @@ class TreeSequence:
     def number(self):
         return len(self.trees)
 
-    def tree_scenic_score(self, tree: Tree):
-        tree_index = self.trees.index(tree)
-        l_score = 0
-        for i in reversed(range(tree_index)):
-            l_score += 1
-            if tree > self.trees[i]:
-                continue
-            else:
-                break
-
-        r_score = 0
-        for j in range(tree_index+1, self.number):
-            r_score += 1
-            if tree > self.trees[j]:
-                continue
-            else:
-                break
-
-        l_score = 1 if l_score == 0 else l_score
-        r_score = 1 if r_score == 0 else r_score
-        return l_score * r_score
-
     def visible_trees(self, trees: Iterable[Tree]):
         biggest_height = -1
         visible = []
@@ -131,13 +108,11 @@ class TreeSchool:
         return unique
 
     def compute_trees_scenic_scores(self):
-        for col in self.cols:
-            for tree in col.trees:
-                tree.scenic_score = col.tree_scenic_score(tree)
-
-        for row in self.rows:
-            for tree in row.trees:
-                tree.scenic_score = row.tree_scenic_score(tree)
+        heights = np.array([[tree.height for tree in row.trees] for row in self.rows], dtype=np.uint8)
+        scenic_scores = Forest(heights).scenic_scores().tolist()
+        for row, row_scores in zip(self.rows, scenic_scores):
+            for tree, score in zip(row.trees, row_scores):
+                tree.scenic_score = score
 
 
 def load_trees(file_name):
@@ -168,10 +143,223 @@ def load_trees(file_name):
     return tree_school
 
 
+def viewing_distances(heights: List[int]) -> List[int]:
+    """Trees seen from every tree looking towards the start of the line, with one monotonic stack pass.
+
+    The stack keeps the indexes of trees that can still block the view, tallest at the bottom.
+    """
+    distances = []
+    blocking = []
+    for index, height in enumerate(heights):
+        while blocking and heights[blocking[-1]] < height:
+            blocking.pop()
+        distances.append(index - blocking[-1] if blocking else index)
+        blocking.append(index)
+    return distances
+
+
+assert viewing_distances([3, 3, 5, 4, 9]) == [0, 1, 2, 1, 4]
+assert viewing_distances([2, 5, 5, 1, 2]) == [0, 1, 1, 1, 2]
+
+
+def check_grid(grid: np.ndarray, source: str):
+    """Raise ValueError unless every row of the byte grid is digits followed by a newline."""
+    digits = grid[:, :-1]
+    if not (grid[:, -1] == ord('\n')).all() or not ((digits >= ord('0')) & (digits <= ord('9'))).all():
+        raise ValueError(f'{source} is not a grid of {grid.shape[1] - 1}-wide rows of digits')
+
+
+class Forest:
+    """Tree heights as a uint8 grid, with every question answered by whole-array operations."""
+
+    def __init__(self, heights: np.ndarray):
+        self.heights = heights
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        data = data.rstrip(b'\n') + b'\n'
+        width = data.index(b'\n')
+        if len(data) % (width + 1):
+            raise ValueError(f'data is not a grid of {width}-wide rows of digits')
+        grid = np.frombuffer(data, dtype=np.uint8).reshape(-1, width + 1)
+        check_grid(grid, 'data')
+        return cls(grid[:, :width] - ord('0'))
+
+    @classmethod
+    def load(cls, file_name: str):
+        with open(file_name, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+    @staticmethod
+    def visible_from_left(heights: np.ndarray) -> np.ndarray:
+        visible = np.ones(heights.shape, dtype=bool)
+        visible[:, 1:] = heights[:, 1:] > np.maximum.accumulate(heights, axis=1)[:, :-1]
+        return visible
+
+    def visible_masks(self) -> List[np.ndarray]:
+        """Visibility from the left, right, top and bottom."""
+        heights = self.heights
+        return [
+            self.visible_from_left(heights),
+            self.visible_from_left(heights[:, ::-1])[:, ::-1],
+            self.visible_from_left(heights.T).T,
+            self.visible_from_left(heights[::-1].T).T[::-1],
+        ]
+
+    def visible_from_outside(self) -> np.ndarray:
+        return np.logical_or.reduce(self.visible_masks())
+
+    def visible_count(self) -> int:
+        return int(self.visible_from_outside().sum())
+
+    @staticmethod
+    def viewing_distances_to_left(heights: np.ndarray) -> np.ndarray:
+        return np.array([viewing_distances(row) for row in heights.tolist()], dtype=np.int64).reshape(heights.shape)
+
+    def viewing_distance_matrices(self) -> List[np.ndarray]:
+        """Viewing distances to the left, right, top and bottom."""
+        heights = self.heights
+        return [
+            self.viewing_distances_to_left(heights),
+            self.viewing_distances_to_left(heights[:, ::-1])[:, ::-1],
+            self.viewing_distances_to_left(heights.T).T,
+            self.viewing_distances_to_left(heights[::-1].T).T[::-1],
+        ]
+
+    def scenic_scores(self) -> np.ndarray:
+        return np.prod(self.viewing_distance_matrices(), axis=0)
+
+    def best_scenic_score(self) -> Tuple[int, Tuple[int, int]]:
+        """Highest scenic score and the (row, col) of its tree."""
+        scenic_scores = self.scenic_scores()
+        row, col = np.unravel_index(scenic_scores.argmax(), scenic_scores.shape)
+        return int(scenic_scores[row, col]), (int(row), int(col))
+
+
+def shared_arrays(memories: List[SharedMemory], shape: Tuple[int, int]):
+    """Heights (raw ASCII digits), visibility and scenic scores over the shared blocks.
+
+    The arrays are only valid while `memories` stay open.
+    """
+    rows, width = shape
+    grid = np.ndarray((rows, width + 1), dtype=np.uint8, buffer=memories[0].buf)
+    visible = np.ndarray(shape, dtype=bool, buffer=memories[1].buf)
+    scenic_scores = np.ndarray(shape, dtype=np.int64, buffer=memories[2].buf)
+    return grid[:, :width], visible, scenic_scores
+
+
+def analyse_band(names: Tuple[str, str, str], shape: Tuple[int, int], by_rows: bool, start: int, stop: int):
+    """Visibility and viewing distances along the rows (or columns) start:stop, merged into the shared outputs."""
+    memories = [SharedMemory(name) for name in names]
+    heights, visible, scenic_scores = shared_arrays(memories, shape)
+    band = heights[start:stop] if by_rows else heights[:, start:stop].T
+    band_visible = Forest.visible_from_left(band) | Forest.visible_from_left(band[:, ::-1])[:, ::-1]
+    band_scores = Forest.viewing_distances_to_left(band) * Forest.viewing_distances_to_left(band[:, ::-1])[:, ::-1]
+
+    if by_rows:
+        visible[start:stop] |= band_visible
+        scenic_scores[start:stop] *= band_scores
+    else:
+        visible[:, start:stop] |= band_visible.T
+        scenic_scores[:, start:stop] *= band_scores.T
+
+    del heights, visible, scenic_scores, band
+    for memory in memories:
+        memory.close()
+
+
+def parallel_forest_analysis(file_name: str, workers: int = None) -> Tuple[int, Tuple[int, Tuple[int, int]]]:
+    """Visible tree count and best scenic score with its (row, col), like Forest, computed by a process pool.
+
+    The grid is read straight into shared memory and never becomes Python objects. Workers take disjoint bands
+    of rows, then of columns, and merge into shared visibility and score matrices. Digits are compared as
+    ASCII bytes, whose order matches the heights.
+    """
+    workers = workers or os.cpu_count()
+    with open(file_name, 'rb') as file:
+        width = len(file.readline().rstrip(b'\n'))
+        grid_size = file.seek(0, os.SEEK_END)
+        while grid_size:
+            file.seek(grid_size - 1)
+            if file.read(1) != b'\n':
+                break
+            grid_size -= 1
+
+    rows = (grid_size + 1) // (width + 1)
+    if not width or rows * (width + 1) != grid_size + 1:
+        raise ValueError(f'{file_name} is not a grid of {width}-wide rows')
+    shape = (rows, width)
+
+    memories = [
+        SharedMemory(create=True, size=rows * (width + 1)),
+        SharedMemory(create=True, size=rows * width),
+        SharedMemory(create=True, size=rows * width * 8),
+    ]
+    names = tuple(memory.name for memory in memories)
+    try:
+        with open(file_name, 'rb') as file, memories[0].buf[:grid_size] as grid:
+            file.readinto(grid)
+        memories[0].buf[grid_size] = ord('\n')
+        check_grid(np.ndarray((rows, width + 1), dtype=np.uint8, buffer=memories[0].buf), file_name)
+        _, visible, scenic_scores = shared_arrays(memories, shape)
+        visible[:] = False
+        scenic_scores[:] = 1
+
+        with ProcessPoolExecutor(workers) as executor:
+            for by_rows, length in ((True, rows), (False, width)):
+                bounds = list(range(0, length, max(length // (workers * 4), 1))) + [length]
+                list(executor.map(analyse_band, repeat(names), repeat(shape), repeat(by_rows), bounds[:-1], bounds[1:]))
+
+        row, col = np.unravel_index(scenic_scores.argmax(), shape)
+        result = int(visible.sum()), (int(scenic_scores[row, col]), (int(row), int(col)))
+        del visible, scenic_scores
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+    return result
+
+
+test_forest = Forest.load('test_input.txt')
+for test_data in [b'30373\n2551\n653321\n', b'30373\n2551\n65332\n', b'303\r\n255\r\n', b'3a3\n255\n']:
+    try:
+        Forest.from_bytes(test_data)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(f'{test_data} accepted')
+assert test_forest.heights.shape == (5, 5)
+assert test_forest.visible_count() == 21
+assert test_forest.visible_count() == len(load_trees('test_input.txt').visible_from_outside())
+assert test_forest.scenic_scores()[1, 2] == 4
+assert test_forest.best_scenic_score() == (8, (3, 2))
+
+
 tree_school = load_trees('input.txt')
 tree_school.compute_trees_scenic_scores()
 
 print(max(tree.scenic_score for tree in tree_school.trees))
 
-
-
+forest = Forest.load('input.txt')
+print(forest.visible_count())
+assert forest.best_scenic_score()[0] == max(tree.scenic_score for tree in tree_school.trees)
+
+if __name__ == '__main__':
+    assert parallel_forest_analysis('test_input.txt', workers=2) == (test_forest.visible_count(), test_forest.best_scenic_score())
+    assert parallel_forest_analysis('input.txt', workers=4) == (forest.visible_count(), forest.best_scenic_score())
+
+    with tempfile.TemporaryDirectory() as test_directory:
+        test_grid_file = os.path.join(test_directory, 'grid.txt')
+        with open(test_grid_file, 'wb') as file:
+            file.write(b'30373\n25512\n65332\n33549\n35390\n\n')
+        assert parallel_forest_analysis(test_grid_file, workers=2) == (21, (8, (3, 2)))
+
+        for test_data in [b'30373\n2551\n65332\n', b'30373\n2551\n653321\n', b'30373\r\n25512\r\n65332\r\n']:
+            with open(test_grid_file, 'wb') as file:
+                file.write(test_data)
+            try:
+                parallel_forest_analysis(test_grid_file, workers=2)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f'{test_data} accepted')
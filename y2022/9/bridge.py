@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import abc
 import copy
 import math
+import os
+import tempfile
+from array import array
+from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import List, Tuple, Literal, Optional
+from typing import List, Tuple, Literal, Optional, Iterable, Iterator, Set, Dict
 import matplotlib.pyplot as plt
+import numpy as np
 
 
 @dataclass
@@ -80,18 +86,31 @@ class Entity:
 
 
 class RopeSegment(Entity):
-    def __init__(self, index: str, next_segment: RopeSegment = None, *args, **kwargs):
+    def __init__(self, index: str, next_segment: RopeSegment = None, *args, sink: TrailSink = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.index = index
         self.next_segment = next_segment
+        self.sink = sink
         self.unique_object = object()
+        if self.sink:
+            self.record_position()
+
+    @property
+    def knot(self) -> int:
+        return 0 if self.index == 'H' else int(self.index)
 
     def notify(self):
         if self.next_segment:
             self.next_segment.update(self)
 
+    def record_position(self):
+        if self.sink.records(self.knot):
+            self.sink.record(self.knot, *self.coords.get_simple())
+
     def move(self, movement: Move):
         super().move(movement)
+        if self.sink:
+            self.record_position()
         self.notify()
 
     def update(self, previous_segment: RopeSegment):
@@ -99,9 +118,15 @@ class RopeSegment(Entity):
             self.coords = point_between
             self.notify()
 
-        self.logs.append(self.coords.get_simple())
+        if self.sink:
+            self.record_position()
+        else:
+            self.logs.append(self.coords.get_simple())
 
     def show_plot(self):
+        if self.sink is not None:
+            raise ValueError('Positions went to the sink, not to logs; plot them with show_trail_plot')
+
         xx = []
         yy = []
         for x, y in self.logs:
@@ -124,6 +149,247 @@ def load_actions(file_name):
     return actions
 
 
+STEPS = {'R': (1, 0), 'L': (-1, 0), 'U': (0, 1), 'D': (0, -1)}
+
+
+def load_moves(file_name) -> Iterator[Tuple[str, int]]:
+    """Run-length moves, one (direction, steps) per line."""
+    with open(file_name) as file:
+        for line in file:
+            direction, steps = line.split()
+            yield direction, int(steps)
+
+
+def pack_coords(x: int, y: int) -> int:
+    return (x << 32) | (y & 0xFFFFFFFF)
+
+
+def simulate_rope(moves: Iterable[Tuple[str, int]], knots: int = 10) -> Set[int]:
+    """Cells visited by the tail of a rope with `knots` knots, packed with pack_coords.
+
+    Knot positions live in two flat lists, and a step stops propagating at the first knot that does not move.
+    """
+    xs = [0] * knots
+    ys = [0] * knots
+    tail = knots - 1
+    visited = {pack_coords(0, 0)}
+
+    for direction, steps in moves:
+        step_x, step_y = STEPS[direction]
+        for _ in range(steps):
+            xs[0] += step_x
+            ys[0] += step_y
+            for knot in range(1, knots):
+                dx = xs[knot - 1] - xs[knot]
+                dy = ys[knot - 1] - ys[knot]
+                if -1 <= dx <= 1 and -1 <= dy <= 1:
+                    break
+                xs[knot] += (dx > 0) - (dx < 0)
+                ys[knot] += (dy > 0) - (dy < 0)
+            else:
+                visited.add(pack_coords(xs[tail], ys[tail]))
+    return visited
+
+
+test_moves = [('R', 4), ('U', 4), ('L', 3), ('D', 1), ('R', 4), ('D', 1), ('L', 5), ('R', 2)]
+assert len(simulate_rope(test_moves, 2)) == 13
+assert len(simulate_rope(test_moves, 10)) == 1
+assert len(simulate_rope([('R', 5), ('U', 8), ('L', 8), ('D', 3), ('R', 17), ('D', 10), ('L', 25), ('U', 20)], 10)) == 36
+assert simulate_rope([('R', 2), ('L', 3)], 1) == {pack_coords(x, 0) for x in range(-1, 3)}
+
+
+class TrailBitmap:
+    """Cells visited by one knot, one bit each, in 64x64 tiles that exist only where the knot has been.
+
+    Memory follows the area actually walked rather than the bounding box of the whole path.
+    """
+    TILE_SHIFT = 6
+    TILE_MASK = (1 << TILE_SHIFT) - 1
+
+    def __init__(self):
+        self.tiles: Dict[Tuple[int, int], bytearray] = {}
+        self.count = 0
+
+    def add(self, x: int, y: int):
+        key = (x >> self.TILE_SHIFT, y >> self.TILE_SHIFT)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.tiles[key] = bytearray(1 << (2 * self.TILE_SHIFT - 3))
+
+        bit = ((y & self.TILE_MASK) << self.TILE_SHIFT) | (x & self.TILE_MASK)
+        mask = 1 << (bit & 7)
+        if not tile[bit >> 3] & mask:
+            tile[bit >> 3] |= mask
+            self.count += 1
+
+
+test_bitmap = TrailBitmap()
+for test_x, test_y in [(0, 0), (31, -32), (0, 0), (-100, 5), (31, -32), (500, 700), (-100, 5), (63, 0), (64, 0)]:
+    test_bitmap.add(test_x, test_y)
+assert test_bitmap.count == 6
+assert sorted(test_bitmap.tiles) == [(-2, 0), (0, -1), (0, 0), (1, 0), (7, 10)]
+test_bitmap.add(0, 0)
+assert test_bitmap.count == 6
+
+
+class TrailSink(abc.ABC):
+    """Receives knot positions while a rope moves. Only the knots in `knots` are recorded, every knot if None."""
+
+    def __init__(self, knots: Optional[Iterable[int]] = None):
+        self.knots = None if knots is None else set(knots)
+
+    def records(self, knot: int) -> bool:
+        return self.knots is None or knot in self.knots
+
+    @abc.abstractmethod
+    def record(self, knot: int, x: int, y: int):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CountDistinctSink(TrailSink):
+    """Keeps only which cells each knot visited, as a TrailBitmap per knot, so memory follows the visited area."""
+
+    def __init__(self, knots: Optional[Iterable[int]] = None):
+        super().__init__(knots)
+        self.trails: Dict[int, TrailBitmap] = defaultdict(TrailBitmap)
+
+    def record(self, knot: int, x: int, y: int):
+        self.trails[knot].add(x, y)
+
+    def counts(self) -> Dict[int, int]:
+        return {knot: trail.count for knot, trail in sorted(self.trails.items())}
+
+
+class BinaryTrailSink(TrailSink):
+    """Streams (knot, x, y) rows to a binary file as int32, `batch_size` rows per write. Read back with load_trail."""
+
+    def __init__(self, file_name: str, knots: Optional[Iterable[int]] = None, batch_size: int = 1 << 16):
+        super().__init__(knots)
+        self.file = open(file_name, 'wb')
+        self.batch_size = batch_size
+        self.batch = array('i')
+
+    def record(self, knot: int, x: int, y: int):
+        self.batch.extend((knot, x, y))
+        if len(self.batch) >= 3 * self.batch_size:
+            self.flush()
+
+    def flush(self):
+        np.frombuffer(self.batch, dtype=np.int32).tofile(self.file)
+        del self.batch[:]
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def load_trail(file_name: str) -> np.ndarray:
+    """(n, 3) array of knot, x, y rows written by BinaryTrailSink."""
+    return np.fromfile(file_name, dtype=np.int32).reshape(-1, 3)
+
+
+def show_trail_plot(file_name: str, knot: int):
+    trail = load_trail(file_name)
+    trail = trail[trail[:, 0] == knot]
+    plt.scatter(trail[:, 1], trail[:, 2], s=100)
+    plt.show()
+
+
+def simulate_rope_into(moves: Iterable[Tuple[str, int]], sink: TrailSink, knots: int = 10):
+    """Moves a rope with `knots` knots and hands every position of the knots the sink records to it."""
+    xs = [0] * knots
+    ys = [0] * knots
+    recorded = [sink.records(knot) for knot in range(knots)]
+    for knot in range(knots):
+        if recorded[knot]:
+            sink.record(knot, 0, 0)
+
+    for direction, steps in moves:
+        step_x, step_y = STEPS[direction]
+        for _ in range(steps):
+            xs[0] += step_x
+            ys[0] += step_y
+            if recorded[0]:
+                sink.record(0, xs[0], ys[0])
+            for knot in range(1, knots):
+                dx = xs[knot - 1] - xs[knot]
+                dy = ys[knot - 1] - ys[knot]
+                if -1 <= dx <= 1 and -1 <= dy <= 1:
+                    break
+                xs[knot] += (dx > 0) - (dx < 0)
+                ys[knot] += (dy > 0) - (dy < 0)
+                if recorded[knot]:
+                    sink.record(knot, xs[knot], ys[knot])
+
+
+def simulate_rope_trails(moves: Iterable[Tuple[str, int]], knots: int = 10) -> List[int]:
+    """Distinct cells visited by every knot, head first, from a single simulation.
+
+    A knot never depends on the knots behind it, so the count for knot i is also the tail count of an (i+1)-knot rope.
+    """
+    sink = CountDistinctSink()
+    simulate_rope_into(moves, sink, knots)
+    return list(sink.counts().values())
+
+
+assert simulate_rope_trails(test_moves, 10) == [len(simulate_rope(test_moves, knots)) for knots in range(1, 11)]
+
+test_long_moves = [('R', 20000), ('U', 20000)]
+test_long_bitmap = TrailBitmap()
+for test_x, test_y in [(x, 0) for x in range(20001)] + [(20000, y) for y in range(20001)]:
+    test_long_bitmap.add(test_x, test_y)
+assert test_long_bitmap.count == 40001
+assert len(test_long_bitmap.tiles) == 2 * (20000 // 64 + 1) - 1
+assert simulate_rope_trails(test_long_moves, 2) == [40001, len(simulate_rope(test_long_moves, 2))]
+
+try:
+    TrailSink()
+except TypeError:
+    pass
+else:
+    raise AssertionError('TrailSink is abstract')
+
+test_sink = CountDistinctSink(knots=[1, 9])
+simulate_rope_into(test_moves, test_sink)
+assert test_sink.counts() == {1: 13, 9: 1}
+
+test_segment_sink = CountDistinctSink()
+test_head = None
+for test_index in ['9', '8', '7', '6', '5', '4', '3', '2', '1', 'H']:
+    test_head = RopeSegment(test_index, test_head, coords=Coords(1, 1), sink=test_segment_sink)
+for test_direction, test_steps in test_moves:
+    for _ in range(test_steps):
+        test_head.move(Move(test_direction))
+assert list(test_segment_sink.counts().values()) == simulate_rope_trails(test_moves, 10)
+try:
+    test_head.show_plot()
+except ValueError:
+    pass
+else:
+    raise AssertionError('show_plot ignored the sink')
+
+test_long_sink = CountDistinctSink()
+simulate_rope_into(test_long_moves, test_long_sink)
+assert all(len(trail.tiles) <= len(test_long_bitmap.tiles) for trail in test_long_sink.trails.values())
+
+with tempfile.TemporaryDirectory() as test_directory:
+    test_trail_file = os.path.join(test_directory, 'trail.bin')
+    with BinaryTrailSink(test_trail_file, knots=[1], batch_size=4) as test_binary_sink:
+        simulate_rope_into(test_moves, test_binary_sink)
+    test_trail = load_trail(test_trail_file)
+    assert test_trail.dtype == np.int32 and set(test_trail[:, 0]) == {1}
+    assert len({(x, y) for _, x, y in test_trail.tolist()}) == 13
+
+
 class Test:
 
     def __init__(self, file_name):
@@ -182,4 +448,7 @@ for movement in actions:
     s1.move(movement)
 
 
-print(len(set(s10.logs)))
\ No newline at end of file
+print(len(set(s10.logs)))
+
+assert len(simulate_rope(load_moves('input.txt'), 10)) == len(set(s10.logs))
+assert simulate_rope_trails(load_moves('input.txt'), 10) == [len(simulate_rope(load_moves('input.txt'), knots)) for knots in range(1, 11)]